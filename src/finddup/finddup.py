@@ -22,29 +22,90 @@
 #     e.g. DIR1: fileA, fileB
 #          DIR2: fileA, fileB, fileC
 #     still might want to delete DIR1 even though it doesn't match exactly DIR2
-# TODO: could check if duplicate files have same inode? (hard link)?
-#   maybe too esoteric
 
+from collections import OrderedDict, defaultdict, deque
+import concurrent.futures
+import hashlib
+import itertools
+import json
+import math
+from operator import itemgetter
 import os
 import os.path
 import stat
 import sys
 import time
 import textwrap
+import threading
 from pathlib import Path
-from typing import Tuple, List
+from typing import Tuple, List, Union
 
 import tictoc
 
-
-# how much total memory bytes to use during comparison of files
-#   (Larger is faster up to a point)
+try:
+    import fcntl
+except ImportError:
+    # Windows has no fcntl module
+    fcntl = None
+try:
+    import resource
+except ImportError:
+    # Windows has no resource module
+    resource = None
+
+
+# how much total bytes of file data to read on each compare pass, over all
+#   files being compared (Larger is faster up to a point)
+#   Read data is hashed file by file, so each thread only holds one
+#   file's share of its part of this in memory at a time.
 MEM_TO_USE = 512 * 1024 * 1024  # 512MB
 MEM_TO_USE = 2 * 1024 * 1024 * 1024  # 2GB
 MEM_TO_USE = 1024 * 1024 * 1024  # 1GB
 
 # how many files we can have open at the same time
+#   (leave headroom below the OS limit for everything else we open)
 MAX_FILES_OPEN = 200
+if resource is not None:
+    _nofile_limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+    if _nofile_limit == resource.RLIM_INFINITY:
+        MAX_FILES_OPEN = 4096
+    else:
+        MAX_FILES_OPEN = max(min(_nofile_limit - 64, 4096), 2)
+
+# how many equal-size file groups to compare at the same time
+#   (MEM_TO_USE and MAX_FILES_OPEN are shared between them)
+#   On spinning disks only one group is compared at a time (see
+#   is_rotational), since reading more files at once only adds seeks.
+COMPARE_THREADS = min(8, os.cpu_count() or 1)
+
+# how many bytes to read from each file on the first compare pass
+#   (much more than the header of most file formats, which is where most
+#   files of the same size but different types already differ, but costs
+#   about the same single read as a few bytes does)
+FIRST_READ_SIZE = 64 * 1024  # 64KB
+
+# least amount of bytes to read from each file on a compare pass after the
+#   first, no matter how many files are being compared
+MIN_READ_SIZE = 1024 * 1024  # 1MB
+
+# how many bytes to read at a time when streaming a pair of files
+PAIR_READ_SIZE = 1024 * 1024  # 1MB
+
+# files bigger than SUFFIX_MIN_SIZE have their last SUFFIX_READ_SIZE bytes
+#   compared right after their header, before reading everything in between
+#   (files with the same header often still differ near their end)
+SUFFIX_READ_SIZE = 4096
+SUFFIX_MIN_SIZE = 1024 * 1024  # 1MB
+
+# how many threads stat files while sizing, and how many files each thread
+#   stats at a time (stat mostly waits on the filesystem, not the CPU, so
+#   many can be outstanding at once)
+STAT_THREADS = 16
+STAT_BATCH_SIZE = 1024
+
+# on macOS, files at least this big are read without being cached by the OS
+#   (smaller files are cheap to cache, and uncached small reads are slow)
+NOCACHE_MIN_SIZE = 64 * 1024 * 1024  # 64MB
 
 
 class StderrPrinter:
@@ -86,6 +147,198 @@ class StderrPrinter:
 # Global
 myerr = StderrPrinter()
 
+# Windows has no st_blocks in stat results
+HAS_ST_BLOCKS = hasattr(os.stat_result, "st_blocks")
+
+# unit prefixes for num2eng, index is the power of k
+NUM2ENG_PREFIXES = ("", "k", "M", "G", "T", "P")
+
+
+def open_fd(filepath):
+    """Open file descriptor for reading file data once, from start to end.
+
+    Tells the OS the file will be read sequentially.  Where that isn't
+    possible (macOS), tells the OS not to cache the file's data instead, if
+    the file is at least NOCACHE_MIN_SIZE bytes.
+
+    Raises:
+        OSError: if file cannot be opened
+    """
+    fd = os.open(
+        filepath,
+        os.O_RDONLY | getattr(os, "O_CLOEXEC", 0) | getattr(os, "O_BINARY", 0),
+    )
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        except OSError:
+            # only a hint, reading works the same without it
+            pass
+    elif hasattr(fcntl, "F_NOCACHE"):
+        try:
+            if os.fstat(fd).st_size >= NOCACHE_MIN_SIZE:
+                fcntl.fcntl(fd, fcntl.F_NOCACHE, 1)
+        except OSError:
+            # only a hint, reading works the same without it
+            pass
+    return fd
+
+
+def close_fd(fd):
+    """Close file descriptor, first dropping its data from the OS cache.
+
+    Each file's data is only read once, so keeping it cached would only
+    push out cached data of other programs.
+    """
+    if hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            # only a hint, the fd must be closed either way
+            pass
+    os.close(fd)
+
+
+def read_at(fd, filepos, buffer):
+    """Read open file fd starting at filepos into writable buffer.
+
+    Reads up to len(buffer) bytes, fewer only at end of file.
+
+    Returns:
+        number of bytes read into buffer
+
+    Raises:
+        OSError: if file cannot be read
+    """
+    if hasattr(os, "preadv"):
+        # one syscall, and doesn't depend on the fd's file position
+        return os.preadv(fd, [buffer], filepos)
+    os.lseek(fd, filepos, os.SEEK_SET)
+    if hasattr(os, "readv"):
+        return os.readv(fd, [buffer])
+    # Windows has no readv, so read and copy into buffer
+    filedata = os.read(fd, len(buffer))
+    buffer[: len(filedata)] = filedata
+    return len(filedata)
+
+
+def fastest_file_hash():
+    """Find the fastest way to hash file data on this machine.
+
+    sha256 is much faster than blake2b on CPUs with SHA instructions (used
+    by the OpenSSL behind hashlib), and slower on CPUs without them, so
+    time both on a little data.  Both release the GIL while hashing
+    compare-sized chunks, so compare threads hash in parallel either way.
+
+    Returns:
+        function that returns a new hash object
+    """
+
+    def new_blake2b():
+        return hashlib.blake2b(digest_size=16)
+
+    data = bytes(256 * 1024)
+    best_time = None
+    best_hash = None
+    for new_hash in (new_blake2b, hashlib.sha256):
+        # best of a few tries, to not be fooled by one slow run
+        for _ in range(3):
+            start_time = time.perf_counter()
+            new_hash().update(data)
+            this_time = time.perf_counter() - start_time
+            if best_time is None or this_time < best_time:
+                best_time = this_time
+                best_hash = new_hash
+    return best_hash
+
+
+# makes a new hash object for file data
+new_file_hash = fastest_file_hash()
+
+
+class FDPool:
+    """Pool of open file descriptors for reading files by path.
+
+    Keeps up to max_open files open at the same time, closing the least
+    recently used file when another file needs to be opened.  Reading a
+    file that is still open in the pool costs no open() or close().
+    """
+
+    def __init__(self, max_open):
+        self.max_open = max_open
+        # key: filepath, item: open file descriptor, least recently used first
+        self.fds = OrderedDict()
+
+    def _get_fd(self, filepath):
+        """Return open file descriptor for filepath, opening it if needed."""
+        fd = self.fds.get(filepath)
+        if fd is None:
+            if len(self.fds) >= self.max_open:
+                (_, lru_fd) = self.fds.popitem(last=False)
+                close_fd(lru_fd)
+            fd = open_fd(filepath)
+            self.fds[filepath] = fd
+        else:
+            self.fds.move_to_end(filepath)
+        return fd
+
+    def prefetch(self, filepath, filepos, amt_file_read):
+        """Ask OS to start reading amt_file_read bytes at filepos in filepath.
+
+        Returns immediately, so the OS can read many files at once while
+        we wait on the first one.  Errors are ignored here, they will be
+        raised again by readinto().
+        """
+        if not hasattr(os, "posix_fadvise"):
+            return
+        try:
+            fd = self._get_fd(filepath)
+            os.posix_fadvise(fd, filepos, amt_file_read, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+
+    def release(self, filepath, filepos, amt_file_read):
+        """Tell OS that amt_file_read bytes at filepos in filepath are done.
+
+        That part of the file will never be read again, so the OS can drop it
+        from its cache now instead of when the file is closed.  Does nothing
+        if filepath is not open.
+        """
+        if not hasattr(os, "posix_fadvise") or filepath not in self.fds:
+            return
+        try:
+            os.posix_fadvise(
+                self.fds[filepath], filepos, amt_file_read, os.POSIX_FADV_DONTNEED
+            )
+        except OSError:
+            # only a hint, nothing is lost without it
+            pass
+
+    def readinto(self, filepath, filepos, buffer):
+        """Read filepath starting at filepos into writable buffer.
+
+        Reads up to len(buffer) bytes, fewer only at end of file.
+
+        Returns:
+            number of bytes read into buffer
+
+        Raises:
+            OSError: if file cannot be opened or read
+        """
+        return read_at(self._get_fd(filepath), filepos, buffer)
+
+    def close(self, filepath):
+        """Close filepath if it is open in the pool."""
+        fd = self.fds.pop(filepath, None)
+        if fd is not None:
+            close_fd(fd)
+
+    def close_all(self):
+        """Close all files open in the pool."""
+        while self.fds:
+            (_, fd) = self.fds.popitem()
+            close_fd(fd)
+
 
 def num2eng(num, k=1024):
     """Convert input num to string with unit prefix
@@ -101,22 +354,19 @@ def num2eng(num, k=1024):
     Returns:
         numstr: string of formatted decimal number with unit prefix at end
     """
-    if num > k**5:
-        numstr = "%.1fP" % (float(num) / k**5)
-    elif num > k**4:
-        numstr = "%.1fT" % (float(num) / k**4)
-    elif num > k**3:
-        numstr = "%.1fG" % (float(num) / k**3)
-    elif num > k**2:
-        numstr = "%.1fM" % (float(num) / k**2)
-    elif num > k:
-        numstr = "%.1fk" % (float(num) / k)
-    else:
-        numstr = "%.1g" % (float(num))
-    return numstr
-
-
-def check_stat_file(filepath: Path, ignore_files: bool):
+    if num <= k:
+        return "%.1g" % (float(num))
+    # biggest power of k that num is more than (up to P)
+    power = min(int(math.log(num, k)), len(NUM2ENG_PREFIXES) - 1)
+    # log is a float, fix it if it rounded across a power of k
+    if num <= k**power:
+        power -= 1
+    elif power < len(NUM2ENG_PREFIXES) - 1 and num > k ** (power + 1):
+        power += 1
+    return "%.1f%s" % (float(num) / k**power, NUM2ENG_PREFIXES[power])
+
+
+def check_stat_file(filepath: Union[Path, os.DirEntry], ignore_files: frozenset):
     """Get file's stat from os, and handle files we ignore.
 
     Get filestat on file if possible (i.e. readable), discard if symlink,
@@ -124,9 +374,12 @@ def check_stat_file(filepath: Path, ignore_files: bool):
     if discarded file.  All files possible to stat return valid blocks
     (to allow for parent dir sizing later).
 
+    If filepath is an os.DirEntry from os.scandir, its stat is used, which
+    is often already cached from reading the directory.
+
     Args:
-        filepath: path to file to check
-        ignore_files: dict with filenames to ignore as keys, True as value
+        filepath: path or os.DirEntry of file to check
+        ignore_files: set of filenames to ignore
 
     Returns:
         this_size: integer size of file in bytes from file stat.  -1 if
@@ -135,18 +388,23 @@ def check_stat_file(filepath: Path, ignore_files: bool):
         this_blocks: integer size of file in blocks from file stat
         extra_info: list, usually information explaining a skipped or
             errored un-stat'ed file
+        this_inode: (device, inode) tuple identifying file data if file has
+            more than one hard link, else None
     """
     extra_info = []
 
     try:
         # don't follow symlinks, just treat them like a regular file
-        this_filestat = os.stat(filepath, follow_symlinks=False)
+        if isinstance(filepath, os.DirEntry):
+            this_filestat = filepath.stat(follow_symlinks=False)
+        else:
+            this_filestat = os.stat(filepath, follow_symlinks=False)
     except OSError as e:
         # e.g. FileNotFoundError, PermissionError
         # myerr.print("Filestat Error opening:\n"+filepath )
         # myerr.print("  Error: "+str(type(e)))
         # myerr.print("  Error: "+str(e))
-        return (-1, -1, -1, [type(e), str(e)])
+        return (-1, -1, -1, [str(type(e)), str(e)], None)
     except KeyboardInterrupt:
         # get out if we get a keyboard interrupt
         raise
@@ -157,22 +415,27 @@ def check_stat_file(filepath: Path, ignore_files: bool):
         myerr.print("  Error: " + str(e[0]))
         myerr.print("  Error: " + str(e[1]))
         myerr.print("  Error: " + str(e[2]))
-        return (-1, -1, -1, [str(e[0]), str(e[1]), str(e[2])])
+        return (-1, -1, -1, [str(e[0]), str(e[1]), str(e[2])], None)
 
     this_size = this_filestat.st_size
     this_mod = this_filestat.st_mtime
-    try:
+    if HAS_ST_BLOCKS:
         this_blocks = this_filestat.st_blocks
-    except AttributeError:
-        # Windows has no st_blocks attribute
-        this_blocks = this_size // 512 + (1 if this_size % 512 != 0 else 0)
+    else:
+        # size in 512 byte blocks, rounded up
+        this_blocks = -(-this_size // 512)
+    # (st_nlink is 0 from os.DirEntry stat on Windows, never a hard link then)
+    if this_filestat.st_nlink > 1:
+        this_inode = (this_filestat.st_dev, this_filestat.st_ino)
+    else:
+        this_inode = None
 
-    if ignore_files.get(filepath.name, False):
+    if filepath.name in ignore_files:
         this_size = -1
         this_mod = -1
         this_blocks = this_blocks
         extra_info = ["ignore_files"]
-    elif filepath.is_symlink():
+    elif stat.S_ISLNK(this_filestat.st_mode):
         # skip symbolic links without commenting
         this_size = -1
         this_mod = -1
@@ -193,159 +456,173 @@ def check_stat_file(filepath: Path, ignore_files: bool):
     else:
         pass
 
-    return (this_size, this_mod, this_blocks, extra_info)
+    return (this_size, this_mod, this_blocks, extra_info, this_inode)
 
 
-def matching_array_groups(datachunks_list):
-    """Return identical indicies groups from list of data chunks.
+def scan_tree(treeroot):
+    """Yield every non-directory entry in the hierarchy under treeroot.
+
+    Like os.walk, doesn't descend into symbolic links to directories, and
+    silently skips directories that can't be read.
 
     Args:
-        datachunks_list: list of arrays of data, all same size
+        treeroot: path of directory to search
 
-    Returns:
-        match_idx_groups: list of indicies_match_lists for matching data
-            arrays, each sublist has greater than one member
-        single_idx_groups: list of indicies for data arrays that don't
-            match any other data array (singletons)
+    Yields:
+        (root, entry): root is path of directory containing entry, entry is
+            os.DirEntry of file in root
     """
-    match_idx_groups = []
-    # copy into remaining chunks
-    ungrp_chunk_indicies = range(len(datachunks_list))
-
-    # loop through chunks, looking for matches in unsearched chunks for first
-    #   item in unsearched chunks
-    #   item will always match itself, may match others
-    #   save all matching indicies for this chunk into list of indicies
-    #       appended to match_idx_groups
-    while ungrp_chunk_indicies:  # e.g. while len > 0
-        test_idx = ungrp_chunk_indicies[0]
-
-        matching_indicies = []
-        for i in ungrp_chunk_indicies:
-            if datachunks_list[i] == datachunks_list[test_idx]:
-                matching_indicies.append(i)
-
-        match_idx_groups.append(matching_indicies)
-        ungrp_chunk_indicies = [
-            x for x in ungrp_chunk_indicies if x not in matching_indicies
-        ]
+    dirstack = [treeroot]
+    while dirstack:
+        root = dirstack.pop()
+        subdirs = []
+        try:
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if not is_dir:
+                        yield (root, entry)
+                    elif not entry.is_symlink():
+                        subdirs.append(entry.path)
+        except OSError:
+            continue
+        # reversed so subdirs are searched in the order they were found
+        dirstack.extend(reversed(subdirs))
+
+
+def stat_entries(entries, ignore_files: frozenset):
+    """Run check_stat_file on a batch of entries from scan_tree.
 
-    single_idx_groups = [x[0] for x in match_idx_groups if len(x) == 1]
-    match_idx_groups = [x for x in match_idx_groups if x[0] not in single_idx_groups]
+    Args:
+        entries: list of (root, entry) tuples from scan_tree
+        ignore_files: set of filenames to ignore
 
-    return (match_idx_groups, single_idx_groups)
+    Returns:
+        list of (root, entry, stat_info) tuples, where stat_info is the tuple
+            returned by check_stat_file for entry
+    """
+    return [
+        (root, entry, check_stat_file(entry, ignore_files)) for (root, entry) in entries
+    ]
 
 
-def read_filehandle_list(fhlist_group, amt_file_read):
-    """Read amt_file_read bytes in each of list of open filehandles.
+def stat_tree(treeroot, ignore_files: frozenset, executor):
+    """Yield stat info for every non-directory entry in hierarchy under treeroot.
 
-    It is assumed that all files in fhlist_group are the same size in
-    bytes.
+    Entries are found with scan_tree and stat'ed a batch at a time in threads
+    of executor while the tree is still being scanned.  They are yielded in
+    the order scan_tree found them.  If treeroot is a file, only it is
+    yielded.
 
     Args:
-        fhlist_group: list of open file handles to read
-        amt_file_read: amount of bytes to read from each file
+        treeroot: path of directory (or file) to search
+        ignore_files: set of filenames to ignore
+        executor: concurrent.futures.Executor to stat batches of files in
+
+    Yields:
+        (root, entry, stat_info): root is path of directory containing entry,
+            entry is os.DirEntry (or Path) of file, stat_info is the tuple
+            returned by check_stat_file for entry
+    """
+    if not os.path.isdir(treeroot):
+        # this treeroot was a file
+        entry = Path(treeroot)
+        yield (os.path.dirname(treeroot), entry, check_stat_file(entry, ignore_files))
+        return
+
+    entries = scan_tree(treeroot)
+    pending = deque()
+    while True:
+        batch = list(itertools.islice(entries, STAT_BATCH_SIZE))
+        if batch:
+            pending.append(executor.submit(stat_entries, batch, ignore_files))
+        # limit how many batches are waiting, finish all at end
+        while pending and (not batch or len(pending) > 2 * STAT_THREADS):
+            yield from pending.popleft().result()
+        if not batch:
+            return
+
+
+def matching_array_groups(hashers):
+    """Return identical indicies groups from list of running file hashes.
+
+    Indicies are grouped by the digest of each running hash.  Because each
+    running hash covers all data read from a file so far, files grouped
+    together have identical data up to this point, not just identical
+    last chunks.
+
+    Args:
+        hashers: list of running hash objects, one for each file
 
     Returns:
-        fhlist_group_new: version of fhlist_group with unproc_files
-            removed
-        filedata_list: list of arrays of read file data
-        unproc_files: files that were unreadable due to errors
-        file_bytes_read: actual number of bytes read from every valid file
+        match_idx_groups: list of indicies_match_lists for matching
+            hashes, each sublist has greater than one member
+        single_idx_groups: list of indicies for hashes that don't match any
+            other hash (singletons)
     """
-    filedata_list = []
-    filedata_size_list = []
-    unproc_files = []
-    # open files one at a time and close after getting each file's
-    #   data into filedata_list
-    for thisfh in fhlist_group:
-        try:
-            this_filedata = thisfh.read(amt_file_read)
-            filedata_list.append(this_filedata)
-            # filedata_size_list is how many bytes we actually read
-            #   (may be less than max)
-            filedata_size_list.append(len(this_filedata))
-        except OSError as e:
-            # e.g. FileNotFoundError, PermissionError
-            # myerr.print(str(e))
-            unproc_files.append([thisfh.name, str(type(e)), str(e)])
-            # append -1 to signify invalid
-            filedata_list.append(-1)
-            filedata_size_list.append(-1)
-        except KeyboardInterrupt:
-            # get out if we get a keyboard interrupt
-            raise
-        except:
-            # this is really an internal error and should never happen
-            e = sys.exc_info()
-            myerr.print("UNHANDLED Error opening:\n" + thisfh.name)
-            myerr.print("  Error: " + str(e[0]))
-            myerr.print("  Error: " + str(e[1]))
-            myerr.print("  Error: " + str(e[2]))
-            raise e[0]
+    # key: digest of file data so far, item: list of indicies with digest
+    digest_groups = {}
+    for (i, hasher) in enumerate(hashers):
+        digest_groups.setdefault(hasher.digest(), []).append(i)
 
-    # remove invalid files from fhlist_group, filedata_list,
-    #   filedata_size_list
-    invalid_idxs = [
-        i for i in range(len(filedata_size_list)) if filedata_size_list[i] == -1
-    ]
-    fhlist_group_new = [
-        x for (i, x) in enumerate(fhlist_group) if i not in invalid_idxs
-    ]
-    filedata_list = [x for (i, x) in enumerate(filedata_list) if i not in invalid_idxs]
-    filedata_size_list = [
-        x for (i, x) in enumerate(filedata_size_list) if i not in invalid_idxs
-    ]
+    match_idx_groups = [x for x in digest_groups.values() if len(x) > 1]
+    single_idx_groups = [x[0] for x in digest_groups.values() if len(x) == 1]
 
-    if filedata_size_list:
-        file_bytes_read = filedata_size_list[0]
-    else:
-        # all are invalid
-        file_bytes_read = 0
-    return (filedata_list, fhlist_group_new, unproc_files, file_bytes_read)
+    return (match_idx_groups, single_idx_groups)
 
 
-def read_filelist(filelist_group, filepos, amt_file_read):
+def read_filelist(filelist_group, filepos, amt_file_read, fd_pool, buffer, stop=None):
     """Read amt_file_read bytes starting at filepos in list of files.
 
+    The data read from each file is added to that file's running hash, so
+    only one buffer is needed no matter how many files are in the group.
+
     It is assumed that all files in filelist_group are the same size in
     bytes.
 
     Args:
-        filelist_group: list of files to read
+        filelist_group: list of file entries to read, each entry:
+            [filename, running hash of data]
         filepos: starting byte position when reading each file
         amt_file_read: amount of bytes to read from each file
+        fd_pool: FDPool used to open and read files
+        buffer: bytearray to read file data into, at least amt_file_read
+            long
+        stop: threading.Event, if it gets set reading stops before the next
+            file and no files are returned
 
     Returns:
         filelist_group_new: version of filelist_group with unproc_files
             removed
-        filedata_list: list of arrays of read file data
         unproc_files: list of files that were unreadable due to errors,
             each item in list:
             [filename, error_type, error_description]
         file_bytes_read: actual number of bytes read from every valid file
     """
-    filedata_list = []
-    filedata_size_list = []
+    filelist_group_new = []
     unproc_files = []
-    # open files one at a time and close after getting each file's
-    #   data into filedata_list
-    for thisfile in filelist_group:
+    file_bytes_read = None
+    # if all files in group fit in fd_pool, queue up reads of all files
+    #   before waiting on any of them
+    if 2 < len(filelist_group) <= fd_pool.max_open:
+        for (thisfile, _) in filelist_group:
+            fd_pool.prefetch(thisfile, filepos, amt_file_read)
+    view = memoryview(buffer)[:amt_file_read]
+    for file_entry in filelist_group:
+        if stop is not None and stop.is_set():
+            return ([], unproc_files, 0)
+        (thisfile, hasher) = file_entry
         try:
-            with open(thisfile, "rb") as thisfile_fh:
-                thisfile_fh.seek(filepos)
-                this_filedata = thisfile_fh.read(amt_file_read)
-            filedata_list.append(this_filedata)
-            # filedata_size_list is how many bytes we actually read
-            #   (may be less than max)
-            filedata_size_list.append(len(this_filedata))
+            this_bytes_read = fd_pool.readinto(thisfile, filepos, view)
         except OSError as e:
             # e.g. FileNotFoundError, PermissionError
             # myerr.print(str(e))
             unproc_files.append([thisfile, str(type(e)), str(e)])
-            # append -1 to signify invalid
-            filedata_list.append(-1)
-            filedata_size_list.append(-1)
+            fd_pool.close(thisfile)
+            continue
         except KeyboardInterrupt:
             # get out if we get a keyboard interrupt
             raise
@@ -357,26 +634,198 @@ def read_filelist(filelist_group, filepos, amt_file_read):
             myerr.print("  Error: " + str(e[1]))
             myerr.print("  Error: " + str(e[2]))
             raise e[0]
+        hasher.update(view[:this_bytes_read])
+        filelist_group_new.append(file_entry)
+        if file_bytes_read is None:
+            file_bytes_read = this_bytes_read
 
-    # remove invalid files from filelist_group, filedata_list,
-    #   filedata_size_list
-    invalid_idxs = [
-        i for i in range(len(filedata_size_list)) if filedata_size_list[i] == -1
-    ]
-    filelist_group_new = [
-        x for (i, x) in enumerate(filelist_group) if i not in invalid_idxs
-    ]
-    filedata_list = [x for (i, x) in enumerate(filedata_list) if i not in invalid_idxs]
-    filedata_size_list = [
-        x for (i, x) in enumerate(filedata_size_list) if i not in invalid_idxs
-    ]
-
-    if filedata_size_list:
-        file_bytes_read = filedata_size_list[0]
-    else:
+    if file_bytes_read is None:
         # all are invalid
         file_bytes_read = 0
-    return (filedata_list, filelist_group_new, unproc_files, file_bytes_read)
+    return (filelist_group_new, unproc_files, file_bytes_read)
+
+
+def compare_file_pair(filelist, filesize, fileblocks, stop=None):
+    """Compare data in exactly two files by streaming both side by side.
+
+    It is assumed that both files in filelist are the same size in bytes.
+
+    If the files are big, their ends are compared first.  Then both files are
+    read sequentially in PAIR_READ_SIZE blocks, stopping at the first block
+    that differs.  Blocks are read into the same two buffers every time,
+    which are never bigger than the files.
+
+    Args:
+        filelist: list of two files with the same size as each other
+        filesize: size in bytes of both files, or None if unknown
+        fileblocks: dict with key: filepath, item: file size in blocks
+        stop: threading.Event, if it gets set comparing stops before the
+            next block and the results returned are incomplete
+
+    Returns:
+        unique_files: list of files that are verified unique
+        dup_groups: list of lists of files that are verified duplicate
+            data files.  Each sublist:
+            [<size in blocks of all files>, [file1, file2]]
+        unproc_files: list of files that cannot be opened or read
+    """
+    unproc_files = []
+    fds = []
+    try:
+        for filename in filelist:
+            try:
+                fd = open_fd(filename)
+            except OSError as e:
+                # e.g. FileNotFoundError, PermissionError
+                unproc_files.append([filename, str(type(e)), str(e)])
+            else:
+                fds.append((filename, fd))
+
+        if len(fds) < 2:
+            # at most one file readable, it is unique
+            return ([x[0] for x in fds], [], unproc_files)
+
+        if filesize is None:
+            filesize = os.fstat(fds[0][1]).st_size
+        buffer_size = max(min(PAIR_READ_SIZE, filesize), 1)
+        buffers = [bytearray(buffer_size), bytearray(buffer_size)]
+        filepos = 0
+        check_suffix = filesize > SUFFIX_MIN_SIZE
+        while True:
+            if stop is not None and stop.is_set():
+                return ([], [], unproc_files)
+            if check_suffix:
+                readpos = filesize - SUFFIX_READ_SIZE
+                amt_file_read = SUFFIX_READ_SIZE
+            else:
+                readpos = filepos
+                amt_file_read = buffer_size
+            bytes_read = []
+            for ((filename, fd), buffer) in zip(fds, buffers):
+                try:
+                    bytes_read.append(
+                        read_at(fd, readpos, memoryview(buffer)[:amt_file_read])
+                    )
+                except OSError as e:
+                    # e.g. I/O error, remaining file is unique
+                    unproc_files.append([filename, str(type(e)), str(e)])
+                    return ([x[0] for x in fds if x[0] != filename], [], unproc_files)
+            if bytes_read[0] != bytes_read[1]:
+                return (list(filelist), [], unproc_files)
+            # only compare what was read (comparing whole bytearrays is much
+            #   faster than comparing memoryviews, so only slice short reads)
+            if bytes_read[0] == buffer_size:
+                differ = buffers[0] != buffers[1]
+            else:
+                differ = buffers[0][: bytes_read[0]] != buffers[1][: bytes_read[0]]
+            if differ:
+                return (list(filelist), [], unproc_files)
+            if check_suffix:
+                # ends match, now stream the files from the start
+                check_suffix = False
+                continue
+            filepos += bytes_read[0]
+            if not bytes_read[0]:
+                # both files at end with all data identical
+                return ([], [[fileblocks[filelist[0]], list(filelist)]], unproc_files)
+    finally:
+        for (_, fd) in fds:
+            close_fd(fd)
+
+
+def verify_dup_group(filelist, fileblocks, buffers):
+    """Confirm a group of files found identical by hash are byte-identical.
+
+    All files in the group are read side by side in blocks the size of
+    buffers, so each file is read only once.  Every block of each file is
+    compared byte-by-byte with the same block of the first file remaining
+    in the group.  Files that differ from it are dropped and checked again
+    against each other afterwards, so a hash collision only splits the
+    group, it never loses a real duplicate.
+
+    Args:
+        filelist: list of files all believed to have identical data
+        fileblocks: dict with key: filepath, item: file size in blocks
+        buffers: list of two bytearrays of the same size to read file data
+            into, reused for every block
+
+    Returns:
+        unique_files: list of files that are verified unique
+        dup_groups: list of lists of files that are verified duplicate
+            data files.  Each sublist:
+            [<size in blocks of all files>, [file1, file2, ...]
+        unproc_files: list of files that cannot be opened or read
+    """
+    unique_files = []
+    dup_groups = []
+    unproc_files = []
+
+    block_size = len(buffers[0])
+    fd_pool = FDPool(MAX_FILES_OPEN)
+    try:
+        remaining = list(filelist)
+        while len(remaining) > 1:
+            same = remaining
+            differ = []
+            filepos = 0
+            while len(same) > 1:
+                first = same[0]
+                try:
+                    first_read = fd_pool.readinto(first, filepos, buffers[0])
+                except OSError as e:
+                    # e.g. I/O error
+                    unproc_files.append([first, str(type(e)), str(e)])
+                    fd_pool.close(first)
+                    # nothing compared to first file is verified, check all
+                    #   the rest against each other from the start
+                    differ.extend(same[1:])
+                    same = []
+                    break
+                still_same = [first]
+                for other in same[1:]:
+                    try:
+                        other_read = fd_pool.readinto(other, filepos, buffers[1])
+                    except OSError as e:
+                        # e.g. I/O error
+                        unproc_files.append([other, str(type(e)), str(e)])
+                        fd_pool.close(other)
+                        continue
+                    # only compare what was read (comparing whole bytearrays
+                    #   is much faster than slicing, so only slice short reads)
+                    if other_read != first_read:
+                        matches = False
+                    elif first_read == block_size:
+                        matches = buffers[0] == buffers[1]
+                    else:
+                        matches = buffers[0][:first_read] == buffers[1][:first_read]
+                    if matches:
+                        still_same.append(other)
+                    else:
+                        differ.append(other)
+                        fd_pool.close(other)
+                same = still_same
+                if first_read < block_size:
+                    # end of all files still the same
+                    break
+                # this block will never be read again
+                for filename in same:
+                    fd_pool.release(filename, filepos, first_read)
+                filepos += first_read
+
+            if len(same) > 1:
+                dup_groups.append([fileblocks[same[0]], same])
+            elif same:
+                unique_files.append(same[0])
+            for filename in same:
+                fd_pool.close(filename)
+            remaining = differ
+
+        # at most one file left, it matches nothing
+        unique_files.extend(remaining)
+    finally:
+        fd_pool.close_all()
+
+    return (unique_files, dup_groups, unproc_files)
 
 
 # Python default recursion limit: 1000
@@ -385,7 +834,7 @@ def read_filelist(filelist_group, filepos, amt_file_read):
 #       of the same exact size.
 #   If we really wanted to use recursive, we could use it for any members of
 #       filelist smaller than 1000 for sure
-def compare_file_group(filelist, fileblocks):
+def compare_file_group(filelist, filesize, fileblocks, num_threads=1, stop=None):
     """Compare data in files, find groups of identical and unique files.
 
     It is assumed that all files in filelist are the same size in bytes.
@@ -401,7 +850,12 @@ def compare_file_group(filelist, fileblocks):
         filelist: list of lists of files where each sublist is a list
             of files with the same size as each other.  Each sublist:
             [<size in blocks of all files>, [file1, file2, ...]
+        filesize: size in bytes of every file in filelist
         fileblocks: dict with key: filepath, item: file size in blocks
+        num_threads: how many groups are being compared at the same time,
+            each gets an equal share of MEM_TO_USE and MAX_FILES_OPEN
+        stop: threading.Event, if it gets set comparing stops before the
+            next file is read and the results returned are incomplete
 
     Returns:
         unique_files: list of files that are verified unique
@@ -420,53 +874,43 @@ def compare_file_group(filelist, fileblocks):
         # (unique_files,dup_groups,unproc_files)
         return (filelist, [], [])
 
+    # two files can be streamed side by side without any grouping
+    if len(filelist) == 2:
+        return compare_file_pair(filelist, filesize, fileblocks, stop)
+
     # initial file position is 0
+    #   filepos is where the next pass reading from the start of the files
+    #   continues, readpos is where this pass reads
     filepos = 0
+    readpos = 0
 
     # amt_file_read starts small on first pass (most files will be caught)
     #   later it will be upped to maximum for next passes
-    amt_file_read = 256
-
-    # right now only one prospective group of files, split later if distinct
-    #   file groups are found
-    # If group is small enough, we can keep all files open while reading
-    # If group is too big, we open each file one at a time
-    open_filehandles = []
-    if len(filelist) < MAX_FILES_OPEN:
-        try:
-            for filename in filelist:
-                try:
-                    fh = open(filename, "rb")
-                except OSError as e:
-                    # e.g. FileNotFoundError, PermissionError
-                    # myerr.print(str(e))
-                    unproc_files.append([filename, str(type(e)), str(e)])
-                    # print("Can't open "+filename)
-                except KeyboardInterrupt:
-                    # get out if we get a keyboard interrupt
-                    raise
-                except:
-                    # this is really an internal error and should never happen
-                    print("UNHANDLED ERROR WITH OPENING " + filename)
-                    unproc_files.append(filename)
-                    print(unproc_files)
-                else:
-                    open_filehandles.append(fh)
-            # list containing one item that is a list of filehandles
-            filelist_groups_next = [open_filehandles[:]]
-            # TODO: what if open_filehandles is empty or 1 file due
-            #   to file open errors?  how does rest of code handle that?
-        except KeyboardInterrupt:
-            # if we get a keyboard interrupt, close all open handles
-            #   and get out
-            for fh in open_filehandles:
-                fh.close()
-            raise
-    else:
-        # list containing one item that is a list of filenames
-        filelist_groups_next = [filelist]
+    # never read past the known end of the files
+    amt_file_read = min(FIRST_READ_SIZE, filesize)
+
+    # big files get a pass reading only their ends after the first pass
+    suffix_pending = filesize > SUFFIX_MIN_SIZE
+    suffix_pass = False
+
+    # every file gets an entry [filename, running hash] that follows it from
+    #   group to group, so file data is only ever read and hashed once
+    # fd_pool keeps files open between reads, up to this thread's share of
+    #   MAX_FILES_OPEN at once
+    fd_pool = FDPool(max(MAX_FILES_OPEN // num_threads, 2))
+    # buffer to read file data into, reused for every file, group and pass
+    #   until amt_file_read grows
+    buffer = bytearray(0)
     try:
+        # right now only one prospective group of files, split later if
+        #   distinct file groups are found
+        filelist_groups_next = [
+            [[filename, new_file_hash()] for filename in filelist]
+        ]
+
         while filelist_groups_next:  # i.e. while len > 0
+            if stop is not None and stop.is_set():
+                break
             filelist_groups = filelist_groups_next[:]
             # reset next groups
             filelist_groups_next = []
@@ -474,45 +918,30 @@ def compare_file_group(filelist, fileblocks):
             # for debugging print current groups every time through
             # print([len(x) for x in filelist_groups])
 
+            if len(buffer) < amt_file_read:
+                # free old buffer before allocating new one
+                buffer = None
+                buffer = bytearray(amt_file_read)
+
             # each filelist_group is a possible set of duplicate files
             # a file is split off from a filelist_group as it is shown to be
             #   different from others in group, either to a subgroup of matching
             #   files or by itself
             for filelist_group in filelist_groups:
-                if open_filehandles:
-                    # in this case, filelist_group is a list of filehandles
-                    (
-                        filedata_list,
-                        filelist_group,
-                        this_unproc_files,
-                        file_bytes_read,
-                    ) = read_filehandle_list(filelist_group, amt_file_read)
-                    unproc_files.extend(this_unproc_files)
-                else:
-                    # in this case, filelist_group is a list of strings
-                    #   specifying filenames
-                    (
-                        filedata_list,
-                        filelist_group,
-                        this_unproc_files,
-                        file_bytes_read,
-                    ) = read_filelist(filelist_group, filepos, amt_file_read)
-                    unproc_files.extend(this_unproc_files)
-
-                # get groups of indicies with datachunks that match each other
+                (filelist_group, this_unproc_files, file_bytes_read) = read_filelist(
+                    filelist_group, readpos, amt_file_read, fd_pool, buffer, stop
+                )
+                unproc_files.extend(this_unproc_files)
+
+                # get groups of indicies with file data that match each other
                 (match_idx_groups, single_idx_groups) = matching_array_groups(
-                    filedata_list
+                    [x[1] for x in filelist_group]
                 )
 
                 # add to list of unique files for singleton groups
-                if open_filehandles:
-                    unique_files.extend(
-                        [filelist_group[s_i_g].name for s_i_g in single_idx_groups]
-                    )
-                else:
-                    unique_files.extend(
-                        [filelist_group[s_i_g] for s_i_g in single_idx_groups]
-                    )
+                for s_i_g in single_idx_groups:
+                    unique_files.append(filelist_group[s_i_g][0])
+                    fd_pool.close(filelist_group[s_i_g][0])
 
                 # we stop reading a file if it is confirmed unique, or if we get
                 #   to the end of the file
@@ -520,18 +949,17 @@ def compare_file_group(filelist, fileblocks):
                 # for each group > 1 member, see if we need to keep searching it
                 #   or got to end of files
                 for match_idx_group in match_idx_groups:
-                    if file_bytes_read < amt_file_read:
-                        # if bytes read is less data than we tried to
-                        #   read, we are at end of files and this is a final
-                        #   dupgroup
-                        if open_filehandles:
-                            this_dup_group_list = [
-                                filelist_group[i].name for i in match_idx_group
-                            ]
-                        else:
-                            this_dup_group_list = [
-                                filelist_group[i] for i in match_idx_group
-                            ]
+                    if not suffix_pass and (
+                        file_bytes_read < amt_file_read
+                        or filepos + amt_file_read >= filesize
+                    ):
+                        # if this read reached the known file size, or bytes
+                        #   read is less data than we tried to read, we are at
+                        #   end of files and this is a final dupgroup
+                        this_dup_group_list = []
+                        for i in match_idx_group:
+                            this_dup_group_list.append(filelist_group[i][0])
+                            fd_pool.close(filelist_group[i][0])
                         this_dup_blocks = fileblocks[this_dup_group_list[0]]
                         dup_groups.append([this_dup_blocks, this_dup_group_list])
                     else:
@@ -540,91 +968,126 @@ def compare_file_group(filelist, fileblocks):
                         filelist_groups_next.append(
                             [filelist_group[i] for i in match_idx_group]
                         )
+                        # data just read is already hashed, don't keep it
+                        #   cached while the rest of the file is read
+                        for i in match_idx_group:
+                            fd_pool.release(
+                                filelist_group[i][0], readpos, amt_file_read
+                            )
 
             # increment file position for reading next time through groups
-            filepos = filepos + amt_file_read
-
-            if filelist_groups_next:  # i.e if non-empty
-                # after first pass dramatically increase file read size to max
-                # max file read is total memory to be used divided by num of files
-                #   in largest group this iter
-                # total no more than MEM_TO_USE
-                amt_file_read = MEM_TO_USE // max(
-                    [len(x) for x in filelist_groups_next]
+            if not suffix_pass:
+                filepos = filepos + amt_file_read
+
+            if filelist_groups_next and suffix_pending:
+                # after first pass compare the ends of the files
+                suffix_pending = False
+                suffix_pass = True
+                readpos = filesize - SUFFIX_READ_SIZE
+                amt_file_read = SUFFIX_READ_SIZE
+            elif filelist_groups_next:  # i.e if non-empty
+                # after first pass dramatically increase file read size
+                # each pass reads about this thread's share of MEM_TO_USE
+                #   divided between the files in largest group this iter,
+                #   but never so little from each file that reads stop being
+                #   efficient
+                amt_file_read = max(
+                    (MEM_TO_USE // num_threads)
+                    // max([len(x) for x in filelist_groups_next]),
+                    MIN_READ_SIZE,
                 )
-                # amt_file_read = 5 # small for debugging
-                if amt_file_read < 5:
-                    raise Exception(
-                        "compare_file_group: too many files to compare: "
-                        + str(len(filelist))
-                    )
+                # whole pages only
+                amt_file_read = -(-amt_file_read // 4096) * 4096
+                # no need for a buffer bigger than what is left of the files
+                amt_file_read = min(amt_file_read, filesize - filepos)
+                suffix_pass = False
+                readpos = filepos
     finally:
-        # whatever happens, make sure we close all open filehandles in this
-        #   group
-        for fh in open_filehandles:
-            # print("Closing " + fh.name)
-            fh.close()
+        # whatever happens, make sure we close all open files in this group
+        fd_pool.close_all()
 
     return (unique_files, dup_groups, unproc_files)
 
 
-def recurse_subtree(name, subtree, dir_dict, fileblocks):
-    """Recurse subtree of filetree, at each dir saving dir data id, size.
+def recurse_subtree(name, subtree, dir_dict, fileblocks, dir_ids):
+    """Walk subtree of filetree, at each dir saving dir data id, size.
 
-    Directories are handled after files, because the ID string for a dir
-    is based on the dir/file IDs hierarchically contained in that dir.
+    Directories are handled after files, because the ID for a dir is based
+    on the dir/file IDs hierarchically contained in that dir.
 
-    Recursion causes lowest leaf dirs to be ID'ed first
+    The walk is post-order, so lowest leaf dirs are ID'ed first.  It uses
+    its own stack instead of recursion, so there is no limit on how deep
+    the tree can be.
 
-    Every collection of dir ID string components are alphabetized to ensure
-    the same order for the same set of file IDs.
+    Every collection of dir ID components are sorted to ensure the same
+    order for the same set of file IDs.  Each distinct sorted collection
+    is given a new integer dir ID, so identical dirs get the same dir ID
+    no matter how deep their hierarchy is.
+
+    File IDs are >= 0 and -1 means unknown, so dir IDs count down from -2
+    to never be mistaken for either.
 
     Saves dir IDs into dir_dict.  Saves dir size in blocks into fileblocks.
     Example:
         dir A contains: dir B, file C (ID: 345)
         dir B contains: file D (ID: 401), file E (ID: 405)
-        ID string for dir B: [401,405]
-        ID string for dir A: [[401,405],345]
+        ID components for dir B: (401, 405) -> dir ID: -2
+        ID components for dir A: (-2, 345) -> dir ID: -3
 
     Args:
         name: name of filepath of this directory
         subtree: dict in filetree of this directory
-        dir_dict: READ/WRITE key: hier_id_str, item: list of dir paths
-            with this ID string
+        dir_dict: READ/WRITE defaultdict(list) with key: hier_id, item: list
+            of dir paths with this ID
         fileblocks: READ/WRITE dict with key: filepath, item: size in blocks
+        dir_ids: READ/WRITE key: sorted tuple of dir ID components, item:
+            dir ID for that tuple
 
     Returns:
-        hier_id_str: string based only on fileids of files/dirs inside
-            dir, specifying all fileids of files/dirs inside this dir
-            hierarchically down to lowest levels
+        hier_id: integer based only on fileids of files/dirs inside dir,
+            the same for any dir with the same fileids of files/dirs inside
+            it hierarchically down to lowest levels.  -1 if unknown.
     """
-    itemlist = []
-    dir_blocks = 0
-    for key in subtree.keys():
-        # key is name of dir/file inside of this dir
-        if isinstance(subtree[key], dict):
-            item = recurse_subtree(
-                os.path.join(name, key), subtree[key], dir_dict, fileblocks
-            )
+    # each stack frame is one dir being walked:
+    #   [dir path, prefix for child paths, iterator over children,
+    #   ID components of children done so far, blocks of children so far]
+    # join for the top dir (handles name == "/"), then just concatenate
+    stack = [[name, os.path.join(name, ""), iter(subtree.items()), [], 0]]
+    while True:
+        frame = stack[-1]
+        for (key, value) in frame[2]:
+            # key is name of dir/file inside of this dir
+            child = frame[1] + key
+            if isinstance(value, dict):
+                # walk child dir first, come back to rest of this dir later
+                stack.append([child, child + os.sep, iter(value.items()), [], 0])
+                break
+            frame[3].append(value)
+            frame[4] += fileblocks[child]
         else:
-            item = str(subtree[key])
-        dir_blocks += fileblocks[os.path.join(name, key)]
-        itemlist.append(item)
-
-    # put file blocks back into fileblocks db
-    fileblocks[name] = dir_blocks
-
-    # if any one item is "-1" (unknown file) then this whole directory is "-1"
-    #   in this way we mark every subdir above unknown file as unknown
-    if "-1" in itemlist:
-        hier_id_str = "-1"
-    else:
-        itemlist.sort()
-        hier_id_str = "[" + ",".join(itemlist) + "]"
+            # all children of this dir are done
+            stack.pop()
+            (dir_name, _, _, itemlist, dir_blocks) = frame
+
+            # put file blocks back into fileblocks db
+            fileblocks[dir_name] = dir_blocks
+
+            # if any one item is -1 (unknown file) then this whole directory is
+            #   -1, in this way we mark every subdir above unknown file as
+            #   unknown
+            if -1 in itemlist:
+                hier_id = -1
+            else:
+                itemlist.sort()
+                hier_id = dir_ids.setdefault(tuple(itemlist), -2 - len(dir_ids))
 
-    dir_dict.setdefault(hier_id_str, []).append(name)
+            dir_dict[hier_id].append(dir_name)
 
-    return hier_id_str
+            if not stack:
+                return hier_id
+            # add this dir to its parent dir
+            stack[-1][3].append(hier_id)
+            stack[-1][4] += dir_blocks
 
 
 def get_frequencies(file_size_hash):
@@ -654,8 +1117,8 @@ def get_frequencies(file_size_hash):
             item: how many file groups in file_size_hash are that size
     """
     freq_dict = {}
-    for key in file_size_hash:
-        numfiles = len(file_size_hash[key])
+    for filelist in file_size_hash.values():
+        numfiles = len(filelist)
         freq_dict[numfiles] = freq_dict.get(numfiles, 0) + 1
 
     for key in sorted(freq_dict):
@@ -664,12 +1127,49 @@ def get_frequencies(file_size_hash):
     return freq_dict
 
 
+def is_rotational(path):
+    """Find out if path is stored on a spinning disk.
+
+    Only works on Linux, by looking up the block device of path in /sys.
+
+    Args:
+        path: file or dir path
+
+    Returns:
+        True if on rotational storage, False if not, None if unknown
+    """
+    try:
+        st_dev = os.stat(path).st_dev
+        devdir = os.path.realpath(
+            "/sys/dev/block/%d:%d" % (os.major(st_dev), os.minor(st_dev))
+        )
+        # a partition has no queue of its own, its parent disk does
+        for queuedir in (devdir, os.path.dirname(devdir)):
+            rotational_file = os.path.join(queuedir, "queue", "rotational")
+            if os.path.exists(rotational_file):
+                with open(rotational_file) as rotational_fh:
+                    return rotational_fh.read().strip() == "1"
+    except (OSError, AttributeError, ValueError):
+        # AttributeError: no os.major on Windows
+        pass
+    return None
+
+
 class DupFinder:
-    def __init__(self, searchpaths: List[Path]):
+    def __init__(
+        self,
+        searchpaths: List[Path],
+        verify: bool = False,
+        threads: Union[int, None] = None,
+    ):
         self.searchpaths = None
+        self.verify = verify
+        self.threads = threads
         self.master_root = None
+        self.master_root_prefix = None
         self.file_size_hash = None
         self.filetree = None
+        self.dir_subtrees = None
         self.filemodtimes = None
         self.fileblocks = None
         self.unproc_files = None
@@ -677,14 +1177,17 @@ class DupFinder:
         self.unique_files = None
         self.unique_dirs = None
         self.unknown_dirs = None
+        self.hard_links = None
         # TODO more generalized way of specifying this
-        self.ignore_files = {
-            ".picasa.ini": True,
-            ".DS_Store": True,
-            "Thumbs.db": True,
-            " Icon\r": True,
-            "Icon\r": True,
-        }
+        self.ignore_files = frozenset(
+            [
+                ".picasa.ini",
+                ".DS_Store",
+                "Thumbs.db",
+                " Icon\r",
+                "Icon\r",
+            ]
+        )
 
         # eliminate duplicates, and paths that are sub-paths of other
         #   searchpaths
@@ -704,35 +1207,36 @@ class DupFinder:
         Creates:
             self.master_root: string that is lowest common root dir for all
                 searched files, dirs
+            self.master_root_prefix: master_root ending in a path separator
             self.searchpaths: absolute paths, duplicates removed
         """
-        remove_searchpath = {}
-
         # convert to absolute paths, getting real path, not linked dirs
-        new_searchpaths = [os.path.realpath(x) for x in searchpaths]
         # eliminate duplicate paths
-        new_searchpaths = list(set(new_searchpaths))
+        # sorting by path components puts every path directly after any path
+        #   that contains it (plain string sort would put "/a-b" between "/a"
+        #   and "/a/c")
+        abs_searchpaths = sorted(
+            set(os.path.realpath(x) for x in searchpaths),
+            key=lambda x: x.split(os.sep),
+        )
         # search for paths that are subdir of another path, eliminate them
-        # TODO: this can be problemmatic if we eliminate one we need later?
-        #       Maybe kick one path out and start over from the start?
-        #       re-do this in general...
-        for searchpath1 in new_searchpaths:
-            for searchpath2 in new_searchpaths:
-                test_relpath = os.path.relpath(searchpath1, start=searchpath2)
-                if test_relpath != "." and not test_relpath.startswith(".."):
-                    # if '.' : searchpath1 and searchpath2 are same path
-                    #   (search artifact)
-                    # if relpath doesn't start with .. , then searchpath1 is
-                    #   subdir of searchpath2
-                    remove_searchpath[searchpath1] = True
-        for (i, searchpath) in enumerate(new_searchpaths):
-            if remove_searchpath.get(searchpath, False):
-                del new_searchpaths[i]
-
-        self.master_root = os.path.commonpath(new_searchpaths)
+        #   only the last kept path can contain the current one
+        #   (joining "" adds a trailing slash unless there already is one)
+        new_searchpaths = []
+        kept_prefix = None
+        for searchpath in abs_searchpaths:
+            if kept_prefix is None or not searchpath.startswith(kept_prefix):
+                new_searchpaths.append(searchpath)
+                kept_prefix = os.path.join(searchpath, "")
+
+        # the sort also means the first and last paths have the least in common
+        self.master_root = os.path.commonpath(
+            [new_searchpaths[0], new_searchpaths[-1]]
+        )
         # in case only one searchpath that is a file (strange but possible)
         if not os.path.isdir(self.master_root):
             self.master_root = os.path.dirname(new_searchpaths[0])
+        self.master_root_prefix = os.path.join(self.master_root, "")
         self.searchpaths = new_searchpaths
 
     def _subtree_dict(self, root):
@@ -747,6 +1251,9 @@ class DupFinder:
         The base of filetree corresponds to path master_root.  This creates tree
         dict hierarchical structure if needed to get to root.
 
+        Every subtree found is remembered by its root, so filetree is only
+        walked from the top once per dir.
+
         Args:
             root: filepath of desired dict subtree (absolute path preferred).
 
@@ -756,9 +1263,16 @@ class DupFinder:
             self.master_root: string that is highest common root dir for all
                 searched files, dirs.  Corresponds to root of dict filetree
 
+        Affects:
+            self.dir_subtrees: key: dir path, item: subtree dict of
+                self.filetree for that dir
+
         Returns:
             subtree: dict of filetree for root dir
         """
+        subtree = self.dir_subtrees.get(root)
+        if subtree is not None:
+            return subtree
         # root includes master_root
         root_relative = os.path.relpath(root, start=self.master_root)
         # print( "  root_relative to master_root: " + root_relative)
@@ -767,6 +1281,7 @@ class DupFinder:
             if pathpart and pathpart != ".":
                 # either get pathpart key of subtree or create new one (empty dict)
                 subtree = subtree.setdefault(pathpart, {})
+        self.dir_subtrees[root] = subtree
         return subtree
 
     def analyze(self):
@@ -823,6 +1338,10 @@ class DupFinder:
         Record the modification time for every file (allowing us to check
         later if they changed during processing of this program.)
 
+        Only the first file found for each inode is put in file_size_hash.
+        Any other hard links to the same inode are recorded in hard_links,
+        because they must have the same data without reading them.
+
         Uses:
             self.searchpaths: search paths (each can be dir or file)
             self.master_root: string that is lowest common root dir for all
@@ -836,85 +1355,99 @@ class DupFinder:
             self.filemodtimes: key-filepath, item-file modif. datetime
             self.fileblocks: key-filepath, item-size in blocks
             self.unproc_files: list of files ignored or unable to be read
+            self.hard_links: key-filepath in file_size_hash, item-list of
+                other hard links to that file
         """
 
         self.unproc_files = []
+        self.hard_links = {}
+        # key: (device, inode), item: first filepath found with that inode
+        first_links = {}
         self.file_size_hash = {}
         self.filetree = {}
+        self.dir_subtrees = {}
         self.fileblocks = {}
         self.filemodtimes = {}
-        filesreport_time = time.time()
-
-        # .........................
-        # local function to process one file
-        def process_file_size():
-            """Get size and otherwise catalog one file"""
-            # read/write these from hash_files_by_size scope
-            nonlocal filesdone, filesreport_time
-
-            filepath = os.path.join(root, filename)
-            (this_size, this_mod, this_blocks, extra_info) = check_stat_file(
-                Path(filepath), self.ignore_files
-            )
-            # if valid blocks then record for dir block tally
-            if this_blocks != -1:
-                self.fileblocks[filepath] = this_blocks
-            if this_size == -1:
-                self.unproc_files.append([filepath] + extra_info)
-                return
-
-            # set filename branch of self.filetree to -1 (placeholder, meaning no id)
-            # adding to self.filetree means it will be taken into account when
-            #   determining dir sameness
-            # all ignored files that cause return above will be ignored for
-            #   determining dir sameness
-            self._subtree_dict(root)[filename] = -1
-
-            # setdefault returns [] if this_size key is not found
-            # append as item to self.file_size_hash [filepath,filemodtime] to check if
-            #   modified later
-            self.file_size_hash.setdefault(this_size, []).append(filepath)
-            self.filemodtimes[filepath] = this_mod
-
-            filesdone += 1
-            if filesdone % 1000 == 0 or time.time() - filesreport_time > 15:
-                myerr.print(
-                    "\r  " + str(filesdone) + " files sized.", end="", flush=True
-                )
-                filesreport_time = time.time()
-
-        # .........................
+        filesreport_time = time.monotonic()
 
         # Actual hierarchical file stat processing
-        for treeroot in self.searchpaths:
-            # reset filesdone for each searchpath
-            filesdone = 0
-            myerr.print("Sizing: " + treeroot)
-            # remove trailing slashes, etc.
-            treeroot = os.path.normpath(treeroot)
-            if os.path.isdir(treeroot):
-                for (root, _, files) in os.walk(treeroot):
-                    # TODO: get modtime on directories too, to see if they change?
-                    for filename in files:
-                        process_file_size()
-            else:
-                # this treeroot was a file
-                (root, filename) = os.path.split(treeroot)
-                process_file_size()
-
-            # print final tally with CR
-            myerr.print("\r  " + str(filesdone) + " files sized.")
+        with concurrent.futures.ThreadPoolExecutor(STAT_THREADS) as executor:
+            for treeroot in self.searchpaths:
+                # reset filesdone for each searchpath
+                filesdone = 0
+                myerr.print("Sizing: " + treeroot)
+                # remove trailing slashes, etc.
+                treeroot = os.path.normpath(treeroot)
+                # TODO: get modtime on directories too, to see if they change?
+                for (root, fileentry, stat_info) in stat_tree(
+                    treeroot, self.ignore_files, executor
+                ):
+                    filepath = os.fspath(fileentry)
+                    (
+                        this_size,
+                        this_mod,
+                        this_blocks,
+                        extra_info,
+                        this_inode,
+                    ) = stat_info
+                    # if valid blocks then record for dir block tally
+                    if this_blocks != -1:
+                        self.fileblocks[filepath] = this_blocks
+                    if this_size == -1:
+                        self.unproc_files.append([filepath] + extra_info)
+                        continue
+
+                    # set filename branch of self.filetree to -1 (placeholder,
+                    #   meaning no id)
+                    # adding to self.filetree means it will be taken into account
+                    #   when determining dir sameness
+                    # all ignored files that cause continue above will be ignored
+                    #   for determining dir sameness
+                    self._subtree_dict(root)[fileentry.name] = -1
+
+                    # setdefault returns [] if this_size key is not found
+                    # append as item to self.file_size_hash [filepath,filemodtime]
+                    #   to check if modified later
+                    if this_inode is not None:
+                        first_link = first_links.setdefault(this_inode, filepath)
+                    else:
+                        first_link = filepath
+                    if first_link == filepath:
+                        self.file_size_hash.setdefault(this_size, []).append(filepath)
+                    else:
+                        self.hard_links.setdefault(first_link, []).append(filepath)
+                    self.filemodtimes[filepath] = this_mod
+
+                    filesdone += 1
+                    # only look at the clock every 1000 files, and then only
+                    #   update the display if it hasn't been updated very recently
+                    if filesdone % 1000 == 0:
+                        now = time.monotonic()
+                        if now - filesreport_time > 0.25:
+                            myerr.print(
+                                "\r  " + str(filesdone) + " files sized.",
+                                end="",
+                                flush=True,
+                            )
+                            filesreport_time = now
+
+                # print final tally with CR
+                myerr.print("\r  " + str(filesdone) + " files sized.")
 
         # tally unique, possibly duplicate files
         unique = 0
         nonunique = 0
-        for key in self.file_size_hash:
-            if len(self.file_size_hash[key]) == 1:
+        for filelist in self.file_size_hash.values():
+            if len(filelist) == 1:
                 unique += 1
             else:
-                nonunique += len(self.file_size_hash[key])
+                nonunique += len(filelist)
         myerr.print("\nUnique: %d    " % unique)
         myerr.print("Possibly Non-Unique: %d\n" % nonunique)
+        if self.hard_links:
+            myerr.print(
+                "Hard Links: %d\n" % sum([len(x) for x in self.hard_links.values()])
+            )
 
     def compare_files(self):
         """Determine duplicate, unique files from file data
@@ -947,30 +1480,151 @@ class DupFinder:
         sum_size_total = sum(
             [x * len(y) for (x, y) in self.file_size_hash.items() if len(y) > 1]
         )
-        print(f"sum_size_total = {sum_size_total}")
-        for key in self.file_size_hash:
-            (
-                this_unique_files,
-                this_dup_groups,
-                this_unproc_files,
-            ) = compare_file_group(self.file_size_hash[key], self.fileblocks)
+        compare_keys = []
+        for (key, filelist) in self.file_size_hash.items():
+            if len(filelist) == 1:
+                # only file of this size, it is unique without reading it
+                self.unique_files.append(filelist[0])
+            elif key == 0:
+                # all empty files are duplicates without reading them
+                self.dup_groups.append([self.fileblocks[filelist[0]], filelist])
+            else:
+                compare_keys.append(key)
+        # start with the groups with the most data, so a long comparison is
+        #   not left running by itself at the end
+        compare_keys.sort(key=lambda x: x * len(self.file_size_hash[x]), reverse=True)
+
+        num_threads = self.threads
+        if num_threads is None:
+            if any(is_rotational(x) for x in self.searchpaths):
+                num_threads = 1
+            else:
+                num_threads = COMPARE_THREADS
+
+        # set to make groups already being compared stop early
+        stop = threading.Event()
+        with concurrent.futures.ThreadPoolExecutor(num_threads) as executor:
+            futures = {
+                executor.submit(
+                    compare_file_group,
+                    self.file_size_hash[key],
+                    key,
+                    self.fileblocks,
+                    num_threads,
+                    stop,
+                ): key
+                for key in compare_keys
+            }
+            # key: size in bytes, item: (unique_files, dup_groups, unproc_files)
+            #   merged afterwards in compare_keys order, so the results don't
+            #   depend on which thread finishes first
+            results = {}
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    key = futures[future]
+                    results[key] = future.result()
+                    sum_size_done += key * len(self.file_size_hash[key])
+                    if compare_files_timer.eltime() > old_time + 0.4:
+                        old_time = compare_files_timer.eltime()
+                        compare_files_timer.progress_pr(
+                            frac_done=sum_size_done / sum_size_total,
+                            file=sys.stderr,
+                        )
+            except KeyboardInterrupt:
+                # don't start any more groups, stop the ones running at their
+                #   next read (leaving the with block waits for them), get out
+                stop.set()
+                for future in futures:
+                    future.cancel()
+                raise
+        for key in compare_keys:
+            (this_unique_files, this_dup_groups, this_unproc_files) = results[key]
             self.unique_files.extend(this_unique_files)
             self.dup_groups.extend(this_dup_groups)
             self.unproc_files.extend(this_unproc_files)
-            if len(self.file_size_hash[key]) > 1:
-                sum_size_done += key * len(self.file_size_hash[key])
-            if compare_files_timer.eltime() > old_time + 0.4:
-                old_time = compare_files_timer.eltime()
-                compare_files_timer.progress_pr(
-                    frac_done=sum_size_done / sum_size_total, file=sys.stderr
-                )
+
         # print one last time to get the 100% done tally
+        #   (sum_size_total is 0 if there were no non-empty files to compare)
         compare_files_timer.progress_pr(
-            frac_done=sum_size_done / sum_size_total, file=sys.stderr
+            frac_done=sum_size_done / sum_size_total if sum_size_total else 1.0,
+            file=sys.stderr,
         )
 
         myerr.print("\nFinished comparing file data")
 
+        if self.verify:
+            self._verify_dup_groups()
+
+        # hard links were never compared, give them the same result as the
+        #   file they are linked to
+        self._add_hard_links()
+
+    def _verify_dup_groups(self):
+        """Re-read all duplicate files to confirm their data byte-by-byte
+
+        Duplicates are normally found by matching hashes of file data.  This
+        guards against a hash collision by comparing the actual data.
+
+        Uses:
+            self.fileblocks: dict with key: filepath, item: file size in blocks
+
+        Affects:
+            self.dup_groups: groups that turn out not to match are split
+            self.unique_files: files that match nothing are added
+            self.unproc_files: files that cannot be read are added
+        """
+        myerr.print("Verifying duplicate file data...")
+        dup_groups = self.dup_groups
+        self.dup_groups = []
+        # same two buffers are used to read every group
+        buffers = [bytearray(PAIR_READ_SIZE), bytearray(PAIR_READ_SIZE)]
+        for (_, filelist) in dup_groups:
+            (this_unique_files, this_dup_groups, this_unproc_files) = (
+                verify_dup_group(filelist, self.fileblocks, buffers)
+            )
+            self.unique_files.extend(this_unique_files)
+            self.dup_groups.extend(this_dup_groups)
+            self.unproc_files.extend(this_unproc_files)
+        myerr.print("Finished verifying duplicate file data")
+
+    def _add_hard_links(self):
+        """Add hard links of compared files to the results for those files.
+
+        A file that was unique is no longer unique if it has hard links, it
+        becomes a duplicate group with its hard links.
+
+        Uses:
+            self.hard_links: key: compared filepath, item: list of other hard
+                links to that file
+
+        Affects:
+            self.unique_files: list of filepaths that are unique
+            self.dup_groups: list of lists.  Each list contains:
+                [size in blocks of duplicate files, list of duplicate files]
+            self.unproc_files: list of files that cannot be read
+        """
+        if not self.hard_links:
+            return
+
+        for dup_group in self.dup_groups:
+            dup_group[1] = dup_group[1] + [
+                link for x in dup_group[1] for link in self.hard_links.get(x, [])
+            ]
+
+        unique_files = []
+        for unq_file in self.unique_files:
+            if unq_file in self.hard_links:
+                self.dup_groups.append(
+                    [self.fileblocks[unq_file], [unq_file] + self.hard_links[unq_file]]
+                )
+            else:
+                unique_files.append(unq_file)
+        self.unique_files = unique_files
+
+        for unproc_file in self.unproc_files[:]:
+            for link in self.hard_links.get(unproc_file[0], []):
+                self.unproc_files.append([link] + unproc_file[1:])
+
     def check_files_for_changes(self):
         """Look for files that have been modified during execution of this prog.
 
@@ -987,22 +1641,23 @@ class DupFinder:
             self.dup_groups:
             self.unique_files:
         """
-        for filepath in self.filemodtimes:
-            (this_size, this_mod, this_blocks, extra_info) = check_stat_file(
+        changed = set()
+        for (filepath, start_mod) in self.filemodtimes.items():
+            (this_size, this_mod, this_blocks, extra_info, _) = check_stat_file(
                 Path(filepath), self.ignore_files
             )
-            if this_mod != self.filemodtimes[filepath]:
+            if this_mod != start_mod:
                 # file has changed since start of this program
                 (this_dir, this_file) = os.path.split(filepath)
                 self._subtree_dict(this_dir)[this_file] = -1
                 self.unproc_files.append([filepath, "changed"])
+                changed.add(filepath)
 
-                # remove filepath from dups and unique if found
-                if filepath in self.unique_files:
-                    self.unique_files.remove(filepath)
-                for dup_group in self.dup_groups:
-                    if filepath in dup_group[1]:
-                        dup_group[1].remove(filepath)
+        # remove changed files from dups and unique in one pass over each list
+        if changed:
+            self.unique_files = [x for x in self.unique_files if x not in changed]
+            for dup_group in self.dup_groups:
+                dup_group[1] = [x for x in dup_group[1] if x not in changed]
 
     def create_file_ids(self):
         """Create ID numbers for every file based on file data uniqueness
@@ -1052,14 +1707,14 @@ class DupFinder:
         Inventory directories based on identical/non-identical data in files
         in the hierarchy of each directory (ignoring file/dir names)
 
-        Create unique ID string for each directory that has unique hierarchical
+        Create unique ID for each directory that has unique hierarchical
         contents (based on file data).  For directories that have identical
-        hierarchical files/data, give the same ID string.
+        hierarchical files/data, give the same ID.
 
         Find duplicate directories, and save their total size in blocks.  Also
         find unique directories.
 
-        dir_dict: key: hash based on dir hierarchical contents, item: dir path
+        dir_dict: key: id based on dir hierarchical contents, item: dir paths
 
         Uses:
             self.master_root: string that is lowest common parent dir path of all
@@ -1082,31 +1737,28 @@ class DupFinder:
         """
         dup_dirs = []
         self.unique_dirs = []
-        dir_dict = {}
+        dir_dict = defaultdict(list)
 
-        # recurse_subtree creates a string representation of every subdir
+        # recurse_subtree creates an integer id of every subdir
         #   represented in filetree, based on the a hierarchical concatenation of
         #   the file ids in each subdir's hierarchy of files
-        recurse_subtree(self.master_root, self.filetree, dir_dict, self.fileblocks)
+        recurse_subtree(
+            self.master_root, self.filetree, dir_dict, self.fileblocks, {}
+        )
 
-        # unknown dirs show up with key of "-1", don't consider them for matching
-        self.unknown_dirs = dir_dict.get("-1", [])
+        # unknown dirs show up with key of -1, don't consider them for matching
         # add trailing slash to all dir names
-        self.unknown_dirs = [x + os.path.sep for x in self.unknown_dirs]
-        if self.unknown_dirs:
-            del dir_dict["-1"]
+        self.unknown_dirs = [x + os.path.sep for x in dir_dict.pop(-1, [])]
 
         # find set of unique dirs, sets of duplicate dirs
-        for dirkey in dir_dict:
+        for dir_list in dir_dict.values():
             # first dir path in group (only one if group size = 1)
-            first_dir = dir_dict[dirkey][0]
-            if len(dir_dict[dirkey]) > 1:
+            first_dir = dir_list[0]
+            if len(dir_list) > 1:
                 # duplicate dir group
                 this_blocks = self.fileblocks[first_dir]
-                dup_dirs.append(
-                    [this_blocks, [x + os.path.sep for x in dir_dict[dirkey]]]
-                )
-            elif len(dir_dict[dirkey]) == 1:
+                dup_dirs.append([this_blocks, [x + os.path.sep for x in dir_list]])
+            elif len(dir_list) == 1:
                 # unique dirs
                 self.unique_dirs.append(first_dir + os.path.sep)
             else:
@@ -1131,6 +1783,12 @@ class DupFinder:
         if self.master_root == "/":
             # all paths are abspaths
             filedir_str = filedir
+        elif filedir.startswith(self.master_root_prefix) and len(filedir) > len(
+            self.master_root_prefix
+        ):
+            # all paths inside master_root are already normalized, so just
+            #   cut off master_root (keeping any trailing path separator)
+            filedir_str = filedir[len(self.master_root_prefix) :]
         else:
             # relpath from self.master_root
             filedir_str = os.path.relpath(filedir, start=self.master_root)
@@ -1138,38 +1796,71 @@ class DupFinder:
                 filedir_str += os.path.sep
         return filedir_str
 
-    def print_full_report(self):
+    def _filedirs_rel_master_root(self, filedirs):
+        """Returns the paths of all filedirs relative to master_root.
+
+        Same as _filedir_rel_master_root for every path, but only checks
+        once for master_root being /.
+
+        Args:
+            filedirs: iterable of paths to be translated to relpath of
+                master_root
+
+        Returns:
+            list of filedir paths relative to master_root, or absolute if
+                master_root == "/"
+        """
+        if self.master_root == "/":
+            # all paths are abspaths
+            return list(filedirs)
+        prefix = self.master_root_prefix
+        prefix_len = len(prefix)
+        filedir_rel = self._filedir_rel_master_root
+        return [
+            x[prefix_len:]
+            if x.startswith(prefix) and len(x) > prefix_len
+            else filedir_rel(x)
+            for x in filedirs
+        ]
+
+    def print_full_report(self, out=None):
         # header for report
-        self.print_header()
+        self.print_header(out=out)
 
         # print a sorted (biggest dir/files first) list of dup groups,
         #   alphabetical within each group
-        self.print_sorted_dups()
+        self.print_sorted_dups(out=out)
 
         # print a sorted (alphabetical) list of unique files and dirs
-        self.print_sorted_uniques()
+        self.print_sorted_uniques(out=out)
 
         # print lists of unprocessed files
-        self.print_unproc_files()
+        self.print_unproc_files(out=out)
 
         # print unknown status directories
-        self.print_unknown_dirs()
+        self.print_unknown_dirs(out=out)
 
-    def print_header(self):
+    def print_header(self, out=None):
         """Print header information to start report on files and directories.
 
+        Args:
+            out: file object to write report to, default sys.stdout
+
         Uses:
             self.master_root: string that is lowest common parent dir path of all
                 searched files
         """
         if self.master_root != "/":
-            print("All file paths referenced from:\n" + self.master_root)
+            print("All file paths referenced from:\n" + self.master_root, file=out)
 
-    def print_sorted_dups(self):
+    def print_sorted_dups(self, out=None):
         """Print report of sorted duplicate files and directories.
 
         Sort duplicate groups based on total size in blocks, biggest size first.
 
+        Args:
+            out: file object to write report to, default sys.stdout
+
         Uses:
             self.dup_groups: list of duplicate file/dir groups.  Format for each
                 sublist of this list:
@@ -1177,110 +1868,173 @@ class DupFinder:
             self.master_root: string that is lowest common parent dir path of all
                 searched files
         """
-        print("")
-        print("Duplicate Files/Directories:")
-        print("----------------")
-        for dup_group in sorted(self.dup_groups, reverse=True, key=lambda x: x[0]):
-            print("Duplicate set (%sB each)" % (num2eng(512 * dup_group[0])))
-            for filedir in sorted(dup_group[1]):
-                filedir_str = self._filedir_rel_master_root(filedir)
-                print("  %s" % filedir_str)
-
-    def print_sorted_uniques(self):
+        if out is None:
+            out = sys.stdout
+        print("", file=out)
+        print("Duplicate Files/Directories:", file=out)
+        print("----------------", file=out)
+        for dup_group in sorted(self.dup_groups, reverse=True, key=itemgetter(0)):
+            # write each group all at once
+            lines = ["Duplicate set (%sB each)" % (num2eng(512 * dup_group[0]))]
+            for filedir_str in self._filedirs_rel_master_root(sorted(dup_group[1])):
+                lines.append("  %s" % filedir_str)
+            out.write("\n".join(lines) + "\n")
+
+    def print_sorted_uniques(self, out=None):
         """Print report of sorted list of unique files and directories
 
         Sort list of unique files and directories alphabetically.
 
+        Args:
+            out: file object to write report to, default sys.stdout
+
         Uses:
             self.unique_files: list of unique file/dir paths
             self.master_root: string that is lowest common parent dir path of all
                 searched files
         """
-        unique_filedirs = self.unique_files
-        unique_filedirs.extend(self.unique_dirs)
-        print("\n\nUnique Files/Directories:")
-        print("----------------")
-        for filedir in sorted(unique_filedirs):
-            filedir_str = self._filedir_rel_master_root(filedir)
-            print(filedir_str)
-
-    def print_unproc_files(self):
+        if out is None:
+            out = sys.stdout
+        # sort one new list in place (self.unique_files is left unchanged)
+        unique_filedirs = self.unique_files + self.unique_dirs
+        unique_filedirs.sort()
+        print("\n\nUnique Files/Directories:", file=out)
+        print("----------------", file=out)
+        lines = self._filedirs_rel_master_root(unique_filedirs)
+        if lines:
+            out.write("\n".join(lines) + "\n")
+
+    def print_unproc_files(self, out=None):
         """Print report of all files unable to be processed.
 
         Any files that are unreadable are listed alphabetically.
 
+        Args:
+            out: file object to write report to, default sys.stdout
+
         Uses:
             self.unproc_files: list of unprocessed file paths
         """
-        symlinks = [x[0] for x in self.unproc_files if x[1] == "symlink"]
-        ignored = [x[0] for x in self.unproc_files if x[1] == "ignore_files"]
-        sockets = [x[0] for x in self.unproc_files if x[1] == "socket"]
-        fifos = [x[0] for x in self.unproc_files if x[1] == "fifo"]
-        changes = [x[0] for x in self.unproc_files if x[1] == "changed"]
-
-        # other is anything not in one of the above lists
-        other = [x for x in self.unproc_files if x[0] not in symlinks]
-        other = [x for x in other if x[0] not in ignored]
-        other = [x for x in other if x[0] not in sockets]
-        other = [x for x in other if x[0] not in fifos]
-        other = [x for x in other if x[0] not in changes]
-
-        print("\n\nUnprocessed Files")
+        if out is None:
+            out = sys.stdout
+        # sort unproc files into lists by reason in one pass
+        #   other is any file not in one of the named lists (e.g. a file that
+        #   was deleted is both unreadable and changed, but only listed as
+        #   changed), and keeps the whole error entry
+        buckets = {
+            "symlink": [],
+            "ignore_files": [],
+            "socket": [],
+            "fifo": [],
+            "changed": [],
+        }
+        other = []
+        named_paths = set()
+        for unproc_file in self.unproc_files:
+            if unproc_file[1] in buckets:
+                buckets[unproc_file[1]].append(unproc_file[0])
+                named_paths.add(unproc_file[0])
+            else:
+                other.append(unproc_file)
+        other = [x for x in other if x[0] not in named_paths]
+        # the lists are only ever printed sorted (except changed files), so
+        #   sort them in place once
+        for (reason, bucket) in buckets.items():
+            if reason != "changed":
+                bucket.sort()
+        other.sort()
+        symlinks = buckets["symlink"]
+        ignored = buckets["ignore_files"]
+        sockets = buckets["socket"]
+        fifos = buckets["fifo"]
+        changes = buckets["changed"]
+
+        print("\n\nUnprocessed Files", file=out)
         if other:
-            print("\n\nUnreadable Files (ignored)")
-            print("----------------")
-            for err_file in sorted(other):
-                print(f"err_file = {err_file}")
-                filedir_str = self._filedir_rel_master_root(err_file[0])
-                print("  " + filedir_str)
+            lines = ["\n\nUnreadable Files (ignored)", "----------------"]
+            for err_file in other:
+                lines.append("  " + self._filedir_rel_master_root(err_file[0]))
                 for msg in err_file[1:]:
                     err_str = textwrap.fill(
                         str(msg), initial_indent=" " * 2, subsequent_indent=" " * 6
                     )
-                    print(err_str)
-        if sockets:
-            print("\n\nSockets (ignored)")
-            print("----------------")
-            for filedir in sorted(sockets):
-                filedir_str = self._filedir_rel_master_root(filedir)
-                print("  " + filedir_str)
-        if fifos:
-            print("\n\nFIFOs (ignored)")
-            print("----------------")
-            for filedir in sorted(fifos):
-                filedir_str = self._filedir_rel_master_root(filedir)
-                print("  " + filedir_str)
-        if symlinks:
-            print("\n\nSymbolic Links (ignored)")
-            print("----------------")
-            for filedir in sorted(symlinks):
-                filedir_str = self._filedir_rel_master_root(filedir)
-                print("  " + filedir_str)
-        if changes:
-            print("\n\nChanged Files (since start of this program's execution)")
-            print("----------------")
-            for filedir in changes:
-                filedir_str = self._filedir_rel_master_root(filedir)
-                print("  " + filedir_str)
-        if ignored:
-            print("\n\nIgnored Files")
-            print("----------------")
-            for filedir in sorted(ignored):
-                filedir_str = self._filedir_rel_master_root(filedir)
-                print("  " + filedir_str)
-
-    def print_unknown_dirs(self):
+                    lines.append(err_str)
+            out.write("\n".join(lines) + "\n")
+        for (title, filedirs) in [
+            ("Sockets (ignored)", sockets),
+            ("FIFOs (ignored)", fifos),
+            ("Symbolic Links (ignored)", symlinks),
+            ("Changed Files (since start of this program's execution)", changes),
+            ("Ignored Files", ignored),
+        ]:
+            if filedirs:
+                lines = ["\n\n" + title, "----------------"]
+                for filedir_str in self._filedirs_rel_master_root(filedirs):
+                    lines.append("  " + filedir_str)
+                out.write("\n".join(lines) + "\n")
+
+    def print_unknown_dirs(self, out=None):
         """Print report of all files unable to be processed.
 
         Any directories that contain unreadable files listed alphabetically.
 
+        Args:
+            out: file object to write report to, default sys.stdout
+
         Uses:
             self.unknown_dirs: list of directory paths for dirs that have
                 unreadable files
         """
+        if out is None:
+            out = sys.stdout
         if self.unknown_dirs:
-            print("\n\nUnknown Dirs")
-            print("----------------")
-            for filedir in sorted(self.unknown_dirs):
-                filedir_str = self._filedir_rel_master_root(filedir)
-                print("  " + filedir_str)
+            lines = ["\n\nUnknown Dirs", "----------------"]
+            for filedir_str in self._filedirs_rel_master_root(
+                sorted(self.unknown_dirs)
+            ):
+                lines.append("  " + filedir_str)
+            out.write("\n".join(lines) + "\n")
+
+    def print_ndjson_report(self, out=None):
+        """Print report as one JSON object per line, for other programs to read.
+
+        Nothing is sorted and all paths are absolute.  Every line has a
+        "type" of "duplicate", "unique", "unprocessed" or "unknown_dir".
+
+        Args:
+            out: file object to write report to, default sys.stdout
+
+        Uses:
+            self.dup_groups: list of duplicate file/dir groups
+            self.unique_files: list of unique file paths
+            self.unique_dirs: list of unique dir paths
+            self.unproc_files: list of unprocessed files
+            self.unknown_dirs: list of directory paths for dirs that have
+                unreadable files
+        """
+        if out is None:
+            out = sys.stdout
+        dumps = json.dumps
+        lines = []
+        for (blocks, filedirs) in self.dup_groups:
+            # blocks are 512 byte units of disk usage, like in the text report
+            lines.append(
+                dumps({"type": "duplicate", "blocks": blocks, "paths": filedirs})
+            )
+        for filedir in self.unique_files + self.unique_dirs:
+            lines.append(dumps({"type": "unique", "path": filedir}))
+        for unproc_file in self.unproc_files:
+            lines.append(
+                dumps(
+                    {
+                        "type": "unprocessed",
+                        "path": unproc_file[0],
+                        "reason": unproc_file[1],
+                        "details": unproc_file[2:],
+                    }
+                )
+            )
+        for filedir in self.unknown_dirs:
+            lines.append(dumps({"type": "unknown_dir", "path": filedir}))
+        if lines:
+            out.write("\n".join(lines) + "\n")
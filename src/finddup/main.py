@@ -22,13 +22,12 @@
 #     e.g. DIR1: fileA, fileB
 #          DIR2: fileA, fileB, fileC
 #     still might want to delete DIR1 even though it doesn't match exactly DIR2
-# TODO: could check if duplicate files have same inode? (hard link)?
-#   maybe too esoteric
 
 import os
 import stat
 import sys
 import argparse
+import io
 import time
 import textwrap
 from pathlib import Path
@@ -74,6 +73,27 @@ def process_command_line(argv):
         default=False,
         help="Verbose status messages.",
     )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        default=False,
+        help="Compare duplicate files byte-by-byte after matching their "
+        "hashes.",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="How many groups of files to compare at the same time.  "
+        "Default is 1 on spinning disks, otherwise the number of CPUs (max 8).",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["text", "ndjson"],
+        default="text",
+        help="Report format.  ndjson is one unsorted JSON object per line with "
+        "absolute paths, for other programs to read.  Default: text.",
+    )
 
     # (settings, args) = parser.parse_args(argv)
     args = parser.parse_args(argv)
@@ -106,15 +126,26 @@ def main(argv=None):
         if not search_path.exists():
             print("Error: " + str(search_path) + " does not exist.", file=sys.stderr)
             return 1
+    if args.threads is not None and args.threads < 1:
+        print("Error: --threads must be at least 1.", file=sys.stderr)
+        return 1
 
     # initialize DupFinder object with searchpaths
-    dup_find = DupFinder(search_paths)
+    dup_find = DupFinder(search_paths, verify=args.verify, threads=args.threads)
 
     # ANALYZE FILES, DIRECTORIES
     dup_find.analyze()
 
     # PRINT REPORT
-    dup_find.print_full_report()
+    # build whole report first, then write it all at once
+    report = io.StringIO()
+    if args.format == "ndjson":
+        dup_find.print_ndjson_report(out=report)
+        sys.stdout.write(report.getvalue())
+        mytimer.eltime_pr("Total Elapsed time: ", file=sys.stderr)
+        return 0
+    dup_find.print_full_report(out=report)
+    sys.stdout.write(report.getvalue())
 
     print("")
     mytimer.eltime_pr("Total Elapsed time: ", file=sys.stderr)